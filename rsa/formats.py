@@ -0,0 +1,174 @@
+import base64
+import mmap
+import struct
+import textwrap
+
+# Key files
+
+PEM_PUBLIC_LABEL = "RSA PUBLIC KEY"
+PEM_PRIVATE_LABEL = "RSA PRIVATE EXPONENT"  # only (n, d) is kept, so this is not a PKCS#1 private key
+
+def der_length(length):
+    if length < 0x80:
+        return bytes([length])
+    body = length.to_bytes((length.bit_length() + 7) // 8, 'big')
+    return bytes([0x80 | len(body)]) + body
+
+def der_integer(value):
+    # Two's complement big-endian: a leading zero byte keeps values with the top bit set positive
+    body = value.to_bytes(value.bit_length() // 8 + 1, 'big')
+    return b'\x02' + der_length(len(body)) + body
+
+def der_sequence(values):
+    body = b''.join(der_integer(value) for value in values)
+    return b'\x30' + der_length(len(body)) + body
+
+def der_read_header(view, offset, tag):
+    """Return (content offset, content length) of the element at offset, checked against the data."""
+    if offset + 2 > len(view):
+        raise ValueError("Truncated DER data")
+    if view[offset] != tag:
+        raise ValueError(f"Unexpected DER tag 0x{view[offset]:02x} at offset {offset}")
+    length = view[offset + 1]
+    offset += 2
+    if length & 0x80:
+        size = length & 0x7F
+        if offset + size > len(view):
+            raise ValueError("Truncated DER data")
+        length = int.from_bytes(view[offset:offset + size], 'big')
+        offset += size
+    if offset + length > len(view):
+        raise ValueError("Truncated DER data")
+    return offset, length
+
+def der_parse_sequence(data):
+    view = memoryview(data)
+    offset, length = der_read_header(view, 0, 0x30)
+    end = offset + length
+    values = []
+    while offset < end:
+        offset, length = der_read_header(view[:end], offset, 0x02)
+        values.append(int.from_bytes(view[offset:offset + length], 'big', signed=True))
+        offset += length
+    return values
+
+def pem_encode(label, der):
+    body = '\n'.join(textwrap.wrap(base64.b64encode(der).decode('ascii'), 64))
+    return f"-----BEGIN {label}-----\n{body}\n-----END {label}-----\n".encode('ascii')
+
+def pem_decode(data):
+    lines = data.decode('ascii').strip().splitlines()
+    if not lines[0].startswith('-----BEGIN ') or not lines[-1].startswith('-----END '):
+        raise ValueError("Malformed PEM data")
+    label = lines[0][len('-----BEGIN '):-len('-----')]
+    return label, base64.b64decode(''.join(lines[1:-1]))
+
+def encode_key(key, private=False, key_format='pem'):
+    """Serialize an (exponent, modulus) key as PEM, DER or the plain 'exponent modulus' text form."""
+    exponent, modulus = key
+    if key_format == 'text':
+        return f"{exponent} {modulus}\n".encode('ascii')
+    # Same field order as PKCS#1 RSAPublicKey: modulus first
+    der = der_sequence([modulus, exponent])
+    if key_format == 'der':
+        return der
+    if key_format == 'pem':
+        return pem_encode(PEM_PRIVATE_LABEL if private else PEM_PUBLIC_LABEL, der)
+    raise ValueError(f"Unknown key format: {key_format}")
+
+def decode_key(data):
+    """Parse a key in any of the formats written by encode_key, returning (exponent, modulus)."""
+    if data[:1] != b'\x30':
+        data = data.strip()
+    if data.startswith(b'-----BEGIN '):
+        label, data = pem_decode(data)
+        if label not in (PEM_PUBLIC_LABEL, PEM_PRIVATE_LABEL):
+            raise ValueError(f"Unsupported PEM label: {label}")
+    if data[:1] == b'\x30':
+        values = der_parse_sequence(data)
+        if len(values) != 2:
+            raise ValueError("Key sequence must contain exactly two integers")
+        modulus, exponent = values
+        return exponent, modulus
+    exponent, modulus = data.split()
+    return int(exponent), int(modulus)
+
+def save_key(file_name, key, private=False, key_format='pem'):
+    with open(file_name, 'wb') as file:
+        file.write(encode_key(key, private, key_format))
+
+def load_key(file_name):
+    with open(file_name, 'rb') as file:
+        return decode_key(file.read())
+
+# Ciphertext container
+#
+# Header: magic, version, block width in bytes, block count (all big-endian),
+# followed by `count` blocks of exactly `width` bytes each.
+
+MAGIC = b'RSAC'
+VERSION = 1
+HEADER = struct.Struct('>4sBIQ')
+MAX_WIDTH = 0xFFFFFFFF
+
+def block_width(modulus):
+    return (modulus.bit_length() + 7) // 8
+
+def pack_blocks(blocks, width):
+    if not 0 < width <= MAX_WIDTH:
+        raise ValueError(f"Block width {width} does not fit in the container header")
+    blocks = list(blocks)
+    body = b''.join(block.to_bytes(width, 'big') for block in blocks)
+    return HEADER.pack(MAGIC, VERSION, width, len(blocks)) + body
+
+def is_container(data):
+    return bytes(data[:len(MAGIC)]) == MAGIC
+
+def parse_header(data):
+    """Return (width, count, body) where body is a memoryview over the block bytes of data."""
+    view = memoryview(data)
+    if len(view) < HEADER.size:
+        raise ValueError("Truncated ciphertext header")
+    magic, version, width, count = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("Not an RSA ciphertext container")
+    if version != VERSION:
+        raise ValueError(f"Unsupported container version: {version}")
+    if width == 0:
+        raise ValueError("Invalid block width 0")
+    body = view[HEADER.size:HEADER.size + width * count]
+    if len(body) != width * count:
+        raise ValueError("Truncated ciphertext body")
+    return width, count, body
+
+def iter_blocks(body, width):
+    from_bytes = int.from_bytes
+    for offset in range(0, len(body), width):
+        yield from_bytes(body[offset:offset + width], 'big')
+
+def unpack_blocks(data):
+    width, _, body = parse_header(data)
+    return list(iter_blocks(body, width))
+
+def parse_text_blocks(data):
+    return [int(token) for token in bytes(data).split()]
+
+def parse_ciphertext(data):
+    """Parse either a binary container or the legacy space-separated decimal ciphertext."""
+    if is_container(data):
+        return unpack_blocks(data)
+    return parse_text_blocks(data)
+
+def read_ciphertext_file(file_name):
+    """Read a ciphertext file through mmap so large containers are parsed without copying."""
+    with open(file_name, 'rb') as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return []
+        with mapped:
+            view = memoryview(mapped)
+            try:
+                return parse_ciphertext(view)
+            finally:
+                view.release()
@@ -1,5 +1,13 @@
 import random
 import os
+import sys
+import argparse
+import hashlib
+import secrets
+from functools import lru_cache, partial
+from multiprocessing import Pool, cpu_count
+
+import formats
 
 # RSA operations
 
@@ -8,7 +16,34 @@ def gcd(a, b):
         a, b = b, a % b
     return a
 
+PUBLIC_EXPONENT = 65537  # used for --bits keys
+
+TRIAL_DIVISION_LIMIT = 1 << 32  # above this is_prime switches to Miller-Rabin
+
+def is_probable_prime(num, rounds=40):
+    if num < 4:
+        return num in (2, 3)
+    if num % 2 == 0:
+        return False
+    d, r = num - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+    for _ in range(rounds):
+        x = pow(secrets.randbelow(num - 3) + 2, d, num)
+        if x in (1, num - 1):
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, num)
+            if x == num - 1:
+                break
+        else:
+            return False
+    return True
+
 def is_prime(num):
+    if num >= TRIAL_DIVISION_LIMIT:
+        return is_probable_prime(num)
     if num < 2:
         return False
     for i in range(2, int(num ** 0.5) + 1):
@@ -16,7 +51,15 @@ def is_prime(num):
             return False
     return True
 
-def generate_prime_number():
+def generate_prime_number(bits=None):
+    if bits is not None and bits < 2:
+        raise ValueError("Primes need at least 2 bits.")
+    if bits:
+        # Top two bits set so p * q has exactly 2 * bits bits
+        while True:
+            num = secrets.randbits(bits) | (3 << (bits - 2)) | 1
+            if is_prime(num):
+                return num
     while True:
         num = random.randint(100, 500)  # Adjust the range for larger prime numbers
         if is_prime(num):
@@ -30,7 +73,7 @@ def mod_inverse(a, m):
         x0, x1 = x1 - q * x0, x0
     return x1 + m0 if x1 < 0 else x1
 
-def generate_keypair(p, q):
+def generate_keypair(p, q, e=2):
     if not (is_prime(p) and is_prime(q)):
         raise ValueError("Both numbers must be prime.")
     elif p == q:
@@ -39,7 +82,7 @@ def generate_keypair(p, q):
     n = p * q
     phi = (p - 1) * (q - 1)
 
-    e = 2
+    # e is where the search for a public exponent coprime to phi starts
     while gcd(e, phi) != 1:
         e += 1
 
@@ -62,7 +105,362 @@ def encrypt_file(public_key, file_name):
         print(f"File '{file_name}' not found!")
         return None
 
+# Batch operations
+
+CHUNK_SIZE = 4096  # characters (or ciphertext blocks) handed to a worker at a time
+
+def encrypt_block(public_key, plaintext):
+    e, n = public_key
+    return [pow(ord(char), e, n) for char in plaintext]
+
+def decrypt_block(private_key, blocks):
+    d, n = private_key
+    return ''.join([chr(pow(block, d, n)) for block in blocks])
+
+def split_chunks(items, chunk_size=CHUNK_SIZE):
+    for start in range(0, len(items), chunk_size):
+        yield items[start:start + chunk_size]
+
+def run_chunks(worker, inputs, workers=None, chunk_size=CHUNK_SIZE):
+    """Run worker over every chunk of every input, yielding (index, results) in input order."""
+    inputs = list(inputs)
+    tasks = [(index, chunk) for index, items in enumerate(inputs) for chunk in split_chunks(items, chunk_size)]
+    if workers is None:
+        workers = cpu_count()
+
+    if workers <= 1 or len(tasks) <= 1:
+        results = (worker(chunk) for _, chunk in tasks)
+        pool = None
+    else:
+        pool = Pool(workers)
+        results = pool.imap(worker, [chunk for _, chunk in tasks])
+
+    try:
+        # Chunks of one input are consecutive, so each input can be emitted as soon as its last chunk is back
+        pending = {index: [] for index in range(len(inputs))}
+        remaining = {index: 0 for index in range(len(inputs))}
+        for index, _ in tasks:
+            remaining[index] += 1
+        current = 0
+        for (index, _), result in zip(tasks, results):
+            pending[index].append(result)
+            remaining[index] -= 1
+            while current < len(inputs) and remaining[current] == 0:
+                yield current, pending.pop(current)
+                current += 1
+        while current < len(inputs):
+            yield current, pending.pop(current)
+            current += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+def encrypt_many(public_key, plaintexts, workers=None, chunk_size=CHUNK_SIZE, output_format='text'):
+    """Encrypt several plaintexts in parallel, yielding ciphertexts in input order.
+
+    With output_format='binary' each ciphertext is a bytes container (see formats.pack_blocks),
+    otherwise it is the space-separated decimal string used by the interactive menu.
+    """
+    worker = partial(encrypt_block, public_key)
+    width = formats.block_width(public_key[1])
+    for _, parts in run_chunks(worker, plaintexts, workers, chunk_size):
+        blocks = [block for part in parts for block in part]
+        if output_format == 'binary':
+            yield formats.pack_blocks(blocks, width)
+        else:
+            yield ' '.join(str(block) for block in blocks)
+
+def decrypt_blocks_many(private_key, block_lists, workers=None, chunk_size=CHUNK_SIZE):
+    """Decrypt several lists of ciphertext blocks in parallel, yielding plaintexts in input order."""
+    worker = partial(decrypt_block, private_key)
+    for _, parts in run_chunks(worker, block_lists, workers, chunk_size):
+        yield ''.join(parts)
+
+def decrypt_many(private_key, ciphertexts, workers=None, chunk_size=CHUNK_SIZE):
+    """Decrypt several ciphertexts (text or binary containers) in parallel, yielding plaintexts in input order."""
+    block_lists = (formats.parse_ciphertext(ciphertext.encode() if isinstance(ciphertext, str) else ciphertext)
+                   for ciphertext in ciphertexts)
+    yield from decrypt_blocks_many(private_key, block_lists, workers, chunk_size)
+
+# Signatures (RSASSA-PSS with SHA-256 and MGF1)
+
+HASH = hashlib.sha256
+HASH_SIZE = HASH().digest_size
+SALT_SIZE = HASH_SIZE
+MIN_SIGNING_BITS = 8 * (HASH_SIZE + SALT_SIZE + 1) + 2  # smallest modulus whose PSS encoding fits
+
+def mgf1(seed, length):
+    output = b''
+    counter = 0
+    while len(output) < length:
+        output += HASH(seed + counter.to_bytes(4, 'big')).digest()
+        counter += 1
+    return output[:length]
+
+def pss_encode(message_hash, em_bits, salt=None):
+    em_len = (em_bits + 7) // 8
+    if em_len < HASH_SIZE + SALT_SIZE + 2:
+        raise ValueError(f"Key too small for signing, use at least {MIN_SIGNING_BITS} bits.")
+    if salt is None:
+        salt = secrets.token_bytes(SALT_SIZE)
+    h = HASH(b'\x00' * 8 + message_hash + salt).digest()
+    db = b'\x00' * (em_len - SALT_SIZE - HASH_SIZE - 2) + b'\x01' + salt
+    masked_db = bytearray(a ^ b for a, b in zip(db, mgf1(h, len(db))))
+    masked_db[0] &= 0xFF >> (8 * em_len - em_bits)
+    return bytes(masked_db) + h + b'\xbc'
+
+def pss_verify(message_hash, em, em_bits):
+    em_len = (em_bits + 7) // 8
+    if len(em) != em_len or em_len < HASH_SIZE + SALT_SIZE + 2 or em[-1] != 0xBC:
+        return False
+    masked_db, h = em[:em_len - HASH_SIZE - 1], em[em_len - HASH_SIZE - 1:-1]
+    if masked_db[0] & ~(0xFF >> (8 * em_len - em_bits)) & 0xFF:
+        return False
+    db = bytearray(a ^ b for a, b in zip(masked_db, mgf1(h, len(masked_db))))
+    db[0] &= 0xFF >> (8 * em_len - em_bits)
+    padding_len = em_len - HASH_SIZE - SALT_SIZE - 2
+    if any(db[:padding_len]) or db[padding_len] != 0x01:
+        return False
+    salt = bytes(db[-SALT_SIZE:])
+    return secrets.compare_digest(h, HASH(b'\x00' * 8 + message_hash + salt).digest())
+
+def hash_file(file_name):
+    digest = HASH()
+    with open(file_name, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+def sign_hash(private_key, message_hash):
+    d, n = private_key
+    em = pss_encode(message_hash, n.bit_length() - 1)
+    return pow(int.from_bytes(em, 'big'), d, n).to_bytes(formats.block_width(n), 'big')
+
+def verify_hash(public_key, message_hash, signature):
+    e, n = public_key
+    s = int.from_bytes(signature, 'big')
+    if len(signature) != formats.block_width(n) or s >= n:
+        return False
+    em_bits = n.bit_length() - 1
+    m = pow(s, e, n)
+    if m.bit_length() > em_bits:
+        return False
+    return pss_verify(message_hash, m.to_bytes((em_bits + 7) // 8, 'big'), em_bits)
+
+def sign(private_key, data):
+    return sign_hash(private_key, HASH(data).digest())
+
+def verify(public_key, data, signature):
+    return verify_hash(public_key, HASH(data).digest(), signature)
+
+@lru_cache(maxsize=256)
+def load_key_cached(file_name):
+    # Each worker process keeps its own cache, so audits that reuse a few keys parse them once per worker
+    return formats.load_key(file_name)
+
+def sign_file(private_key, file_name):
+    return file_name, sign_hash(private_key, hash_file(file_name))
+
+def verify_file(job):
+    """Check one (file_name, key_file, signature_file) job, returning (file_name, ok, error)."""
+    file_name, key_file, signature_file = job
+    try:
+        with open(signature_file, 'rb') as file:
+            signature = file.read()
+        return file_name, verify_hash(load_key_cached(key_file), hash_file(file_name), signature), None
+    except (OSError, ValueError) as e:
+        return file_name, False, str(e)
+
+def map_jobs(worker, jobs, workers=None):
+    """Run independent jobs across a process pool, yielding results in job order."""
+    jobs = list(jobs)
+    if workers is None:
+        workers = cpu_count()
+    if workers <= 1 or len(jobs) <= 1:
+        yield from map(worker, jobs)
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap(worker, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+
+def sign_many(private_key, file_names, workers=None):
+    """Sign several files in parallel, yielding (file_name, signature) in input order."""
+    yield from map_jobs(partial(sign_file, private_key), file_names, workers)
+
+def verify_many(jobs, workers=None):
+    """Verify (file_name, key_file, signature_file) jobs in parallel, yielding (file_name, ok, error)."""
+    yield from map_jobs(verify_file, jobs, workers)
+
+# Non-interactive CLI
+
+def read_inputs(file_names):
+    if not file_names or file_names == ['-']:
+        return [('-', sys.stdin.read())]
+    inputs = []
+    for file_name in file_names:
+        with open(file_name, 'r') as file:
+            inputs.append((file_name, file.read()))
+    return inputs
+
+def output_name(file_name, suffix, strip_suffix=None):
+    if strip_suffix and file_name.endswith(strip_suffix):
+        return file_name[:-len(strip_suffix)]
+    return file_name + suffix
+
+def read_ciphertexts(file_names):
+    if not file_names or file_names == ['-']:
+        return [('-', formats.parse_ciphertext(sys.stdin.buffer.read()))]
+    return [(file_name, formats.read_ciphertext_file(file_name)) for file_name in file_names]
+
+def check_targets(names, suffix, strip_suffix=None, to_stdout=False, force=False):
+    """Refuse to start if any output file already exists, unless force is set."""
+    if to_stdout or force:
+        return
+    existing = [output_name(name, suffix, strip_suffix) for name in names if name != '-']
+    existing = [target for target in existing if os.path.exists(target)]
+    if existing:
+        raise SystemExit(f"Refusing to overwrite {', '.join(existing)} (use --force or --stdout)")
+
+def write_outputs(names, results, suffix, strip_suffix=None, to_stdout=False, newline=False):
+    for name, result in zip(names, results):
+        if name == '-' or to_stdout:
+            if isinstance(result, bytes):
+                sys.stdout.buffer.write(result)
+                sys.stdout.buffer.flush()
+            else:
+                # Only text ciphertext gets a trailing newline; decrypted plaintext is written back verbatim
+                sys.stdout.write(result + '\n' if newline else result)
+                sys.stdout.flush()
+        else:
+            target = output_name(name, suffix, strip_suffix)
+            with open(target, 'wb' if isinstance(result, bytes) else 'w') as file:
+                file.write(result)
+            print(f"{name} -> {target}", file=sys.stderr)
+
+def key_bits(value):
+    bits = int(value)
+    if bits < MIN_SIGNING_BITS:
+        raise argparse.ArgumentTypeError(f"must be at least {MIN_SIGNING_BITS}")
+    return bits
+
+def cmd_keygen(args):
+    prime_bits = (args.bits + 1) // 2 if args.bits else None
+    p = generate_prime_number(prime_bits)
+    q = generate_prime_number(prime_bits)
+    while q == p:
+        q = generate_prime_number(prime_bits)
+    # Large keys use the standard e = 65537: with a tiny e the per-character blocks never wrap mod n
+    public_key, private_key = generate_keypair(p, q, PUBLIC_EXPONENT if args.bits else 2)
+    if args.output:
+        formats.save_key(args.output + '.pub', public_key, key_format=args.key_format)
+        formats.save_key(args.output + '.key', private_key, private=True, key_format=args.key_format)
+        print(f"Keys saved to {args.output}.pub and {args.output}.key")
+    else:
+        print("Public Key (e, n):", public_key)
+        print("Private Key (d, n):", private_key)
+
+def cmd_encrypt(args):
+    public_key = formats.load_key(args.key)
+    inputs = read_inputs(args.files)
+    names = [name for name, _ in inputs]
+    check_targets(names, '.enc', to_stdout=args.stdout, force=args.force)
+    results = encrypt_many(public_key, [text for _, text in inputs], args.workers, args.chunk_size, args.format)
+    write_outputs(names, results, '.enc', to_stdout=args.stdout, newline=args.format == 'text')
+
+def cmd_decrypt(args):
+    private_key = formats.load_key(args.key)
+    inputs = read_ciphertexts(args.files)
+    names = [name for name, _ in inputs]
+    check_targets(names, '.dec', strip_suffix='.enc', to_stdout=args.stdout, force=args.force)
+    results = decrypt_blocks_many(private_key, [blocks for _, blocks in inputs], args.workers, args.chunk_size)
+    write_outputs(names, results, '.dec', strip_suffix='.enc', to_stdout=args.stdout)
+
+def cmd_sign(args):
+    private_key = formats.load_key(args.key)
+    if private_key[1].bit_length() < MIN_SIGNING_BITS:
+        raise SystemExit(f"Key too small for signing, use at least {MIN_SIGNING_BITS} bits.")
+    check_targets(args.files, '.sig', force=args.force)
+    for file_name, signature in sign_many(private_key, args.files, args.workers):
+        with open(file_name + '.sig', 'wb') as file:
+            file.write(signature)
+        print(f"{file_name} -> {file_name}.sig", file=sys.stderr)
+
+def read_verify_jobs(args):
+    """Build verify jobs from positional files and/or a list of 'file [key [signature]]' lines."""
+    entries = [[file_name] for file_name in args.files]
+    if args.list:
+        with open(args.list, 'r') as file:
+            entries += [line.split() for line in file if line.strip() and not line.startswith('#')]
+    jobs = []
+    for entry in entries:
+        file_name = entry[0]
+        key_file = entry[1] if len(entry) > 1 else args.key
+        if key_file is None:
+            raise SystemExit(f"No key given for {file_name}")
+        jobs.append((file_name, key_file, entry[2] if len(entry) > 2 else file_name + '.sig'))
+    return jobs
+
+def cmd_verify(args):
+    failed = 0
+    for file_name, ok, error in verify_many(read_verify_jobs(args), args.workers):
+        if not ok:
+            failed += 1
+        if not ok or not args.quiet:
+            print(f"{'OK' if ok else 'FAILED'}: {file_name}" + (f" ({error})" if error else ""))
+    if failed:
+        print(f"{failed} signature(s) failed verification", file=sys.stderr)
+        sys.exit(1)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="RSA encryption tool (run without arguments for the interactive menu)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    keygen = subparsers.add_parser('keygen', help="Generate a key pair")
+    keygen.add_argument('-o', '--output', help="Save keys to OUTPUT.pub and OUTPUT.key instead of printing them")
+    keygen.add_argument('--bits', type=key_bits, help="Modulus size in bits, at least "
+                                                      f"{MIN_SIGNING_BITS} (default: small demo primes)")
+    keygen.add_argument('--key-format', choices=('pem', 'der', 'text'), default='pem', help="Key file format")
+    keygen.set_defaults(func=cmd_keygen)
+
+    for name, func, key_help in (('encrypt', cmd_encrypt, "Public key file (PEM, DER or 'e n')"),
+                                 ('decrypt', cmd_decrypt, "Private key file (PEM, DER or 'd n')")):
+        sub = subparsers.add_parser(name, help=f"{name.capitalize()} files or stdin")
+        sub.add_argument('-k', '--key', required=True, help=key_help)
+        sub.add_argument('files', nargs='*', help="Input files (default: stdin)")
+        sub.add_argument('-j', '--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+        sub.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Blocks per worker task")
+        sub.add_argument('--stdout', action='store_true', help="Write results to stdout instead of files")
+        sub.add_argument('-f', '--force', action='store_true', help="Overwrite existing output files")
+        sub.set_defaults(func=func)
+    subparsers.choices['encrypt'].add_argument('--format', choices=('text', 'binary'), default='text',
+                                               help="Ciphertext format (decrypt detects it automatically)")
+
+    sign_parser = subparsers.add_parser('sign', help="Sign files, writing FILE.sig next to each")
+    sign_parser.add_argument('-k', '--key', required=True, help="Private key file")
+    sign_parser.add_argument('files', nargs='+', help="Files to sign")
+    sign_parser.add_argument('-j', '--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    sign_parser.add_argument('-f', '--force', action='store_true', help="Overwrite existing signature files")
+    sign_parser.set_defaults(func=cmd_sign)
+
+    verify_parser = subparsers.add_parser('verify', help="Verify FILE.sig signatures")
+    verify_parser.add_argument('-k', '--key', help="Public key file used when a list entry names none")
+    verify_parser.add_argument('files', nargs='*', help="Files to verify")
+    verify_parser.add_argument('-l', '--list', help="File with one 'file [key [signature]]' entry per line")
+    verify_parser.add_argument('-j', '--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    verify_parser.add_argument('-q', '--quiet', action='store_true', help="Only report failures")
+    verify_parser.set_defaults(func=cmd_verify)
+
+    return parser
+
+def cli(argv):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
 def main():
+    if len(sys.argv) > 1:
+        cli(sys.argv[1:])
+        return
+
     public_key = None
     private_key = None
     ciphertext = None
@@ -111,13 +509,12 @@ def main():
 
             try:
                 if file_name:
-                    with open(file_name, 'r') as file:
-                        ciphertext = file.read()
+                    blocks = formats.read_ciphertext_file(file_name)
                     print(f"Ciphertext read from {file_name}")
                 else:
-                    ciphertext = input("Enter the ciphertext: ")
+                    blocks = formats.parse_text_blocks(input("Enter the ciphertext: ").encode())
 
-                decrypted = ''.join([chr(pow(int(char), d, n)) for char in ciphertext.split()])
+                decrypted = decrypt_block((d, n), blocks)
                 print("Decrypted message:", decrypted)
 
             except FileNotFoundError:
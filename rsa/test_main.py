@@ -0,0 +1,187 @@
+import pytest
+
+import formats
+import main
+
+# RSASSA-PSS (SHA-256, MGF1-SHA256, 32-byte salt) signature made with an independent implementation
+VECTOR_N = int(
+    'b4fabbb88317a830818e1de51e2f335668382b256961a450fa470620c59d5028'
+    '9ea444dea829d3e41f2748eb85ce36dfcb5b8d1ad4d324ccd7662e80811c91f4'
+    '0efebfded753b2c5232ebef903932dd49fcd08961b1548a3d4c5a4d22b976d63'
+    'b77b7b9b147699523735a88ca12a4d1171231dee00d94af86f60efc74c7da7b3', 16)
+VECTOR_E = 65537
+VECTOR_D = int(
+    '454ec8592f0afe44253951c58ebbb0c364822e33d399ab1dbfdb374391aa5f2a'
+    '4f26c5a127716d4e2d8813eaee813c8e9408698f5ef5c560151572b58fbc6b40'
+    '11242bd79d146e2f1bd443963e08cd8cc178621fae37fe4a75ffa553da9f7de7'
+    'db299ec918899936dd785fa995d48376e7e1c9bb2b158f65ff86c51fc6d237a1', 16)
+VECTOR_MESSAGE = b'backup-manifest-2026-10-19.json'
+VECTOR_SIGNATURE = bytes.fromhex(
+    '94c13e4bbbc0da37f7048e537cfa606c4c99492c3cdfa3451f85c1cb62895a44'
+    'c08a2729a618e2903660250dfd1f2c73cc9dec83880a0e5c10597500dca3224a'
+    '4a28da5da4b579bb84e50bcc4e1165762c00bf4f990ad2d8ad00cb7eda828ecd'
+    '06d44b8ec38b82a62e5b0766a38aa88b11280183d56f995a40d19b369d874c9b')
+
+PUBLIC_KEY = (VECTOR_E, VECTOR_N)
+PRIVATE_KEY = (VECTOR_D, VECTOR_N)
+
+
+def test_known_vector_verifies():
+    assert main.verify(PUBLIC_KEY, VECTOR_MESSAGE, VECTOR_SIGNATURE)
+
+
+def test_known_vector_rejects_other_message():
+    assert not main.verify(PUBLIC_KEY, VECTOR_MESSAGE + b'x', VECTOR_SIGNATURE)
+
+
+def test_sign_verify_round_trip():
+    signature = main.sign(PRIVATE_KEY, b'manifest')
+    assert len(signature) == 128
+    assert main.verify(PUBLIC_KEY, b'manifest', signature)
+
+
+def test_tampered_message_and_signature_fail():
+    signature = main.sign(PRIVATE_KEY, b'manifest')
+    assert not main.verify(PUBLIC_KEY, b'manifest!', signature)
+    tampered = bytes([signature[0] ^ 1]) + signature[1:]
+    assert not main.verify(PUBLIC_KEY, b'manifest', tampered)
+    assert not main.verify(PUBLIC_KEY, b'manifest', signature[:-1])
+
+
+def test_pss_encoding_is_deterministic_for_fixed_salt():
+    message_hash = main.HASH(b'manifest').digest()
+    salt = bytes(range(main.SALT_SIZE))
+    em_bits = VECTOR_N.bit_length() - 1
+    em = main.pss_encode(message_hash, em_bits, salt)
+    assert em == main.pss_encode(message_hash, em_bits, salt)
+    assert em[-1] == 0xBC
+    assert main.pss_verify(message_hash, em, em_bits)
+
+
+def test_key_too_small_for_signing():
+    with pytest.raises(ValueError):
+        main.sign((5, 178729), b'manifest')
+
+
+def test_keygen_rejects_small_bits():
+    with pytest.raises(SystemExit):
+        main.build_parser().parse_args(['keygen', '--bits', '2'])
+
+
+def test_large_keys_use_standard_exponent():
+    p = main.generate_prime_number(300)
+    q = main.generate_prime_number(300)
+    (e, n), (d, _) = main.generate_keypair(p, q, main.PUBLIC_EXPONENT)
+    assert e == 65537
+    assert pow(pow(42, e, n), d, n) == 42
+
+
+DEMO_PUBLIC_KEY, DEMO_PRIVATE_KEY = main.generate_keypair(409, 463)
+MESSAGES = ['hello world\n', '', 'x' * 1000 + 'éè']
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize('output_format', ['text', 'binary'])
+def test_encrypt_decrypt_many_round_trip(workers, output_format):
+    ciphertexts = list(main.encrypt_many(DEMO_PUBLIC_KEY, MESSAGES, workers, chunk_size=64,
+                                         output_format=output_format))
+    assert len(ciphertexts) == len(MESSAGES)
+    assert all(isinstance(ciphertext, bytes if output_format == 'binary' else str) for ciphertext in ciphertexts)
+    assert list(main.decrypt_many(DEMO_PRIVATE_KEY, ciphertexts, workers, chunk_size=64)) == MESSAGES
+
+
+def test_text_ciphertext_matches_single_message_encrypt():
+    assert next(main.encrypt_many(DEMO_PUBLIC_KEY, ['abc'], 1)) == main.encrypt(DEMO_PUBLIC_KEY, 'abc')
+
+
+def test_sign_refuses_to_overwrite_signature(tmp_path):
+    key_file = tmp_path / 'key'
+    key_file.write_bytes(formats.encode_key(PRIVATE_KEY, private=True))
+    data_file = tmp_path / 'manifest'
+    data_file.write_bytes(VECTOR_MESSAGE)
+    signature_file = tmp_path / 'manifest.sig'
+    signature_file.write_bytes(b'keep')
+    with pytest.raises(SystemExit):
+        main.cli(['sign', '-k', str(key_file), '-j', '1', str(data_file)])
+    assert signature_file.read_bytes() == b'keep'
+    main.cli(['sign', '-k', str(key_file), '-j', '1', '--force', str(data_file)])
+    assert main.verify(PUBLIC_KEY, VECTOR_MESSAGE, signature_file.read_bytes())
+
+
+@pytest.mark.parametrize('key_format', ['pem', 'der', 'text'])
+@pytest.mark.parametrize('private', [False, True])
+def test_key_encode_decode_round_trip(key_format, private):
+    key = PRIVATE_KEY if private else PUBLIC_KEY
+    assert formats.decode_key(formats.encode_key(key, private, key_format)) == key
+
+
+def test_pem_labels():
+    assert formats.encode_key(PUBLIC_KEY).startswith(b'-----BEGIN RSA PUBLIC KEY-----')
+    assert formats.encode_key(PRIVATE_KEY, private=True).startswith(b'-----BEGIN RSA PRIVATE EXPONENT-----')
+
+
+@pytest.mark.parametrize('data', [
+    b'\x30\x82\x01',
+    b'\x30',
+    b'\x30\x06\x02\x01\x05',
+    b'\x30\x03\x02\x05\x01',
+    formats.encode_key(PUBLIC_KEY, key_format='der')[:-1],
+    b'-----BEGIN RSA PUBLIC KEY-----\nMAgC\n-----END RSA PUBLIC KEY-----\n',
+    b'-----BEGIN CERTIFICATE-----\nMAA=\n-----END CERTIFICATE-----\n',
+    b'12',
+])
+def test_malformed_keys_raise_value_error(data):
+    with pytest.raises(ValueError):
+        formats.decode_key(data)
+
+
+def test_verify_reports_malformed_key_as_failure(tmp_path):
+    data_file = tmp_path / 'manifest'
+    data_file.write_bytes(VECTOR_MESSAGE)
+    (tmp_path / 'manifest.sig').write_bytes(VECTOR_SIGNATURE)
+    good_key = tmp_path / 'good.pub'
+    good_key.write_bytes(formats.encode_key(PUBLIC_KEY))
+    bad_key = tmp_path / 'bad.pub'
+    bad_key.write_bytes(b'\x30\x82\x01')
+    jobs = [(str(data_file), str(bad_key), str(data_file) + '.sig'),
+            (str(data_file), str(good_key), str(data_file) + '.sig')]
+    results = list(main.verify_many(jobs, workers=1))
+    assert [ok for _, ok, _ in results] == [False, True]
+    assert 'Truncated DER data' in results[0][2]
+
+
+def test_container_round_trip():
+    blocks = [0, 1, 65535, 12345]
+    data = formats.pack_blocks(blocks, 2)
+    assert formats.is_container(data)
+    width, count, body = formats.parse_header(data)
+    assert (width, count, len(body)) == (2, 4, 8)
+    assert formats.unpack_blocks(data) == blocks
+
+
+def test_container_supports_wide_blocks():
+    width = formats.block_width(1 << 4096)
+    blocks = [(1 << 4096) - 1, 7]
+    assert formats.unpack_blocks(formats.pack_blocks(blocks, width)) == blocks
+
+
+@pytest.mark.parametrize('data', [
+    b'RSAC',
+    formats.pack_blocks([1, 2, 3], 2)[:-1],
+    b'XXXX' + formats.pack_blocks([1], 1)[4:],
+    formats.pack_blocks([1], 1)[:4] + b'\x09' + formats.pack_blocks([1], 1)[5:],
+])
+def test_container_truncation_and_corruption_errors(data):
+    with pytest.raises(ValueError):
+        formats.parse_header(data)
+
+
+def test_pack_blocks_rejects_width_out_of_range():
+    with pytest.raises(ValueError):
+        formats.pack_blocks([1], 0)
+    with pytest.raises(ValueError):
+        formats.pack_blocks([1], formats.MAX_WIDTH + 1)
+
+
+def test_parse_ciphertext_accepts_legacy_text():
+    assert formats.parse_ciphertext(b'12 34\n56') == [12, 34, 56]
@@ -0,0 +1,289 @@
+import io
+import re
+
+import numpy as np
+import pytest
+
+from vlsm_alloc import AddressIndex, parse_address
+from vlsm_2 import ip_to_int, legacy_report, plan_subnets, prefix_length_for_hosts
+from vlsm_batch import array_to_ips, assign_subnets, classify_csv, flatten_prefixes, ips_to_array, masks_to_array
+from vlsm_lpm import LPMTable
+from vlsm_planner import plan_many, plan_rows, read_csv_sets
+
+# Subnet planning
+
+
+def test_plan_subnets_matches_legacy_report():
+    sizes = [100, 50, 10, 2, 0, 1, 254, 255]
+    subnets = plan_subnets(ip_to_int('192.168.0.0'), sizes)
+    assert [subnet.render() for subnet in subnets] == legacy_report('192.168.0.0', '/22', sizes)
+
+
+def test_plan_subnets_checks_base_block():
+    with pytest.raises(ValueError):
+        plan_subnets(ip_to_int('192.168.1.0'), [200, 100], 24)
+    with pytest.raises(ValueError):
+        plan_subnets(ip_to_int('192.168.1.1'), [10], 24)
+    assert len(plan_subnets(ip_to_int('192.168.1.0'), [126, 62, 30, 14], 24)) == 4
+
+
+@pytest.mark.parametrize('size, prefix_length', [(0, 31), (1, 30), (2, 30), (254, 24), (255, 23)])
+def test_prefix_length_for_hosts(size, prefix_length):
+    assert prefix_length_for_hosts(size) == prefix_length
+
+
+def test_negative_sizes_are_rejected():
+    with pytest.raises(ValueError):
+        prefix_length_for_hosts(-1)
+    with pytest.raises(ValueError):
+        plan_subnets(ip_to_int('10.0.0.0'), [10, -5], 24)
+
+# Bulk classification
+
+
+def test_ips_to_array_round_trip():
+    ips = ['0.0.0.0', '10.1.2.3', '192.168.0.255', '255.255.255.255']
+    addresses = ips_to_array(ips)
+    assert addresses.tolist() == [ip_to_int(ip) for ip in ips]
+    assert array_to_ips(addresses).tolist() == ips
+    assert ips_to_array([]).size == 0
+
+
+@pytest.mark.parametrize('ip', ['1.2.3', '1.2.3.4.5', '1..2.3', '1.2.3.256', '1.2.3.-1', ' 1.2.3.4', '1.2.3.+4',
+                                'a.b.c.d', '1.2.3.0004', '', '1.2.3.4.'])
+def test_ips_to_array_rejects_malformed_addresses(ip):
+    with pytest.raises(ValueError, match=re.escape(repr(ip))):
+        ips_to_array(['10.0.0.1', ip, '10.0.0.2'])
+
+
+def test_ips_to_array_checks_each_address():
+    # Seven tokens in total would also pass a count over the whole chunk
+    with pytest.raises(ValueError):
+        ips_to_array(['1.2.3', '4.5.6.7.8'])
+
+
+def test_masks_to_array_formats():
+    expected = [0xFFFFFF00, 0xFFFFFF00, 0xFFFFFF00, 0, 0xFFFFFFFF]
+    assert masks_to_array(['255.255.255.0', '/24', '24', '0.0.0.0', '255.255.255.255']).tolist() == expected
+    assert masks_to_array(['24', '/0']).tolist() == [0xFFFFFF00, 0]
+
+
+@pytest.mark.parametrize('mask', ['255.0.255.0', '255.255.255.1', '0.255.255.255', '/33', '33'])
+def test_masks_to_array_rejects_invalid_masks(mask):
+    with pytest.raises(ValueError):
+        masks_to_array(['255.255.255.0', mask])
+
+
+def test_flatten_prefixes_nested_and_duplicate():
+    prefixes = [(ip_to_int('10.0.0.0'), 8), (ip_to_int('10.1.0.0'), 16), (ip_to_int('10.1.0.0'), 16),
+                (ip_to_int('10.1.2.0'), 24)]
+    starts, values = flatten_prefixes(prefixes)
+    addresses = ips_to_array(['9.255.255.255', '10.0.0.1', '10.1.0.1', '10.1.2.9', '10.1.3.0', '10.2.0.0',
+                              '11.0.0.0'])
+    # Duplicates resolve to the later entry
+    assert assign_subnets(addresses, starts, values).tolist() == [-1, 0, 2, 3, 2, 0, -1]
+
+
+def test_flatten_prefixes_default_route_and_edges():
+    starts, values = flatten_prefixes([(0, 0), (0xFFFFFFFF, 32), (ip_to_int('0.0.0.0'), 8)])
+    addresses = ips_to_array(['0.0.0.0', '0.255.255.255', '1.0.0.0', '255.255.255.254', '255.255.255.255'])
+    assert assign_subnets(addresses, starts, values).tolist() == [2, 2, 0, 0, 1]
+    starts, values = flatten_prefixes([])
+    assert assign_subnets(addresses, starts, values).tolist() == [-1] * 5
+
+
+def test_flatten_prefixes_matches_brute_force():
+    rng = np.random.default_rng(0)
+    prefixes = []
+    for _ in range(200):
+        prefix_length = int(rng.integers(0, 33))
+        prefixes.append((int(rng.integers(0, 1 << 32)) & ((0xFFFFFFFF << (32 - prefix_length)) & 0xFFFFFFFF),
+                         prefix_length))
+    addresses = np.concatenate([rng.integers(0, 1 << 32, 2000, dtype=np.uint32),
+                                np.array([network for network, _ in prefixes], dtype=np.uint32)])
+    starts, values = flatten_prefixes(prefixes)
+    result = assign_subnets(addresses, starts, values)
+    for address, index in zip(addresses.tolist(), result.tolist()):
+        matches = [i for i, (network, prefix_length) in enumerate(prefixes)
+                   if address >> (32 - prefix_length) == network >> (32 - prefix_length)]
+        best = max(matches, key=lambda i: (prefixes[i][1], i), default=-1)
+        assert index == best
+
+
+def test_classify_csv_streams_chunks(tmp_path):
+    in_file = tmp_path / 'hosts.csv'
+    in_file.write_text('ip,mask\n10.1.2.3,/24\n10.9.0.1,255.255.0.0\n192.168.1.1,24\n')
+    out_file = io.StringIO()
+    subnets = [(ip_to_int('10.0.0.0'), 8), (ip_to_int('10.1.0.0'), 16)]
+    assert classify_csv(str(in_file), out_file, subnets=subnets, chunk_size=2) == 3
+    assert out_file.getvalue().splitlines() == [
+        'ip,mask,network,prefix_length,broadcast,first_host,last_host,subnet',
+        '10.1.2.3,/24,10.1.2.0,24,10.1.2.255,10.1.2.1,10.1.2.254,10.1.0.0/16',
+        '10.9.0.1,255.255.0.0,10.9.0.0,16,10.9.255.255,10.9.0.1,10.9.255.254,10.0.0.0/8',
+        '192.168.1.1,24,192.168.1.0,24,192.168.1.255,192.168.1.1,192.168.1.254,',
+    ]
+
+# Hierarchical planning
+
+REQUIREMENTS = {
+    'name': 'campus',
+    'base': '10.0.0.0/22',
+    'regions': [{'name': 'north', 'sites': [{'name': 'hq', 'vlans': {'staff': 200, 'voice': 50}},
+                                            {'name': 'lab', 'vlans': {'test': 10}}]}],
+}
+
+
+def test_plan_rows_nests_blocks():
+    name, rows, ok = plan_rows(REQUIREMENTS)
+    assert (name, ok) == ('campus', True)
+    assert [(row['path'], row['network'], row['prefix_length']) for row in rows] == [
+        ('campus', '10.0.0.0', 22),
+        ('campus/north', '10.0.0.0', 22),
+        ('campus/north/hq', '10.0.0.0', 23),
+        ('campus/north/hq/staff', '10.0.0.0', 24),
+        ('campus/north/hq/voice', '10.0.1.0', 26),
+        ('campus/north/lab', '10.0.2.0', 28),
+        ('campus/north/lab/test', '10.0.2.0', 28),
+    ]
+
+
+def test_plan_rows_reports_overflow():
+    name, rows, ok = plan_rows(dict(REQUIREMENTS, base='10.0.0.0/24'))
+    assert not ok
+    assert rows == [{'set': 'campus', 'error': 'Plan needs a /22 (1024 addresses) but the base is /24 (256 addresses)'}]
+
+
+@pytest.mark.parametrize('hosts', [-1, 'many', None])
+def test_plan_rows_reports_bad_host_counts(hosts):
+    requirements = dict(REQUIREMENTS, vlans={'staff': 10, 'bad': hosts})
+    requirements.pop('regions')
+    name, rows, ok = plan_rows(requirements)
+    assert not ok and rows[0]['error']
+
+
+def test_bad_csv_row_fails_only_its_set(tmp_path):
+    csv_file = tmp_path / 'sets.csv'
+    csv_file.write_text('set,base,region,site,vlan,hosts\n'
+                        'a,10.0.0.0/24,r,s,v1,10\n'
+                        'b,10.1.0.0/24,r,s,v1,ten\n'
+                        'c,10.2.0.0/24,r,s,v1,-3\n'
+                        'd,10.3.0.0/24,r,s,v1,20\n')
+    results = list(plan_many(read_csv_sets(str(csv_file)), workers=1))
+    assert [(name, ok) for name, _, ok in results] == [('a', True), ('b', False), ('c', False), ('d', True)]
+
+# Allocation index
+
+
+def test_allocate_lowest_smallest_fit():
+    index = AddressIndex.from_cidr('10.0.0.0/24')
+    assert index.cidr(index.allocate(26, 'a'), 26) == '10.0.0.0/26'
+    assert index.cidr(index.allocate_hosts(10, 'b'), 28) == '10.0.0.64/28'
+    assert index.cidr(index.allocate(25), 25) == '10.0.0.128/25'
+    assert index.cidr(index.allocate(28), 28) == '10.0.0.80/28'
+    with pytest.raises(ValueError):
+        index.allocate(25)
+    with pytest.raises(ValueError):
+        index.allocate(23)
+
+
+def test_free_merges_buddies_back_to_base():
+    index = AddressIndex.from_cidr('10.0.0.0/24')
+    networks = [index.allocate(prefix_length) for prefix_length in (26, 27, 28, 30, 30, 25)]
+    for network in networks[::-1]:
+        index.free(network)
+    stats = index.stats()
+    assert stats['free_blocks_by_prefix'] == {'/24': 1}
+    assert stats['fragmentation'] == 0.0
+    with pytest.raises(ValueError):
+        index.free(networks[0])
+
+
+def test_reserve_and_lookup():
+    index = AddressIndex.from_cidr('10.0.0.0/16')
+    index.reserve(ip_to_int('10.0.4.0'), 22, 'lab')
+    assert index.lookup(ip_to_int('10.0.5.9')) == (ip_to_int('10.0.4.0'), 22, 'lab')
+    assert index.lookup(ip_to_int('10.0.8.1')) is None
+    assert index.cidr(index.allocate(22), 22) == '10.0.0.0/22'
+    assert index.cidr(index.allocate(22), 22) == '10.0.8.0/22'
+    with pytest.raises(ValueError, match='overlaps'):
+        index.reserve(ip_to_int('10.0.4.128'), 25)
+    with pytest.raises(ValueError, match='not aligned'):
+        index.reserve(ip_to_int('10.0.20.1'), 24)
+
+
+@pytest.mark.parametrize('cidr', ['10.1.0.0/24', '10.0.0.0/8', '10.0.0.0/33', '0.0.0.0/0'])
+def test_reserve_rejects_blocks_outside_base(cidr):
+    index = AddressIndex.from_cidr('10.0.0.0/16')
+    network, prefix_length = index.parse_cidr(cidr)
+    with pytest.raises(ValueError, match='outside'):
+        index.reserve(network, prefix_length)
+
+
+def test_lookup_outside_base_or_family():
+    index = AddressIndex.from_cidr('10.0.0.0/8')
+    index.reserve(ip_to_int('10.0.0.0'), 8, 'all')
+    assert index.lookup(ip_to_int('11.0.0.1')) is None
+    # An IPv6 address whose low 32 bits fall inside the base block
+    assert index.lookup(parse_address('2001:db8::a00:1')[0]) is None
+    with pytest.raises(ValueError):
+        index.parse_cidr('2001:db8::/64')
+
+
+def test_ipv6_index():
+    index = AddressIndex.from_cidr('2001:db8::/32')
+    network = index.allocate_hosts(1000, 'site')
+    assert index.cidr(network, 118) == '2001:db8::/118'
+    assert index.lookup(parse_address('2001:db8::1')[0]) == (network, 118, 'site')
+    assert index.lookup(parse_address('10.0.0.1')[0]) is None
+
+
+def test_index_json_round_trip(tmp_path):
+    index = AddressIndex.from_cidr('172.16.0.0/12')
+    index.reserve(ip_to_int('172.16.8.0'), 21, 'existing')
+    for hosts in (500, 60, 2000, 6):
+        index.allocate_hosts(hosts, f"net{hosts}")
+    index.free(ip_to_int('172.16.0.0'))
+    file_name = tmp_path / 'index.json'
+    index.save(file_name)
+    loaded = AddressIndex.load(file_name)
+    assert loaded.allocated == index.allocated
+    assert loaded.stats() == index.stats()
+    assert loaded.allocate(24) == index.allocate(24)
+
+# Longest-prefix-match table
+
+LPM_ENTRIES = [(ip_to_int('10.0.0.0'), 8, 'corp'), (ip_to_int('10.1.0.0'), 16, 'site'),
+               (ip_to_int('10.1.2.0'), 24, ''), (0, 0, 'default')]
+LPM_ADDRESSES = ['10.0.0.1', '10.1.0.1', '10.1.2.3', '10.1.3.0', '11.0.0.0', '0.0.0.0', '255.255.255.255']
+LPM_MATCHES = ['corp', 'site', '10.1.2.0/24', 'site', 'default', 'default', 'default']
+
+
+def test_lpm_table_lookups():
+    table = LPMTable.build(LPM_ENTRIES)
+    assert [table.lookup(ip_to_int(ip)) for ip in LPM_ADDRESSES] == LPM_MATCHES
+    assert [table.names[i] for i in table.lookup_many(ips_to_array(LPM_ADDRESSES))] == LPM_MATCHES
+    assert LPMTable.build(LPM_ENTRIES[:1]).lookup(ip_to_int('11.0.0.0')) is None
+
+
+def test_lpm_table_from_subnets():
+    table = LPMTable.from_subnets(plan_subnets(ip_to_int('192.168.0.0'), [100, 20]))
+    assert table.lookup(ip_to_int('192.168.0.200')) is None
+    assert table.lookup(ip_to_int('192.168.0.130')) == 'Network 2'
+
+
+def test_lpm_table_save_load_round_trip(tmp_path):
+    table = LPMTable.build(LPM_ENTRIES)
+    file_name = tmp_path / 'plan.tbl'
+    table.save(file_name)
+    loaded = LPMTable.load(file_name)
+    assert loaded.starts.tolist() == table.starts.tolist()
+    assert loaded.values.tolist() == table.values.tolist()
+    assert loaded.names == table.names
+    assert [loaded.lookup(ip_to_int(ip)) for ip in LPM_ADDRESSES] == LPM_MATCHES
+
+
+def test_lpm_table_load_rejects_other_files(tmp_path):
+    file_name = tmp_path / 'plan.tbl'
+    file_name.write_bytes(b'NOPE' + bytes(20))
+    with pytest.raises(ValueError):
+        LPMTable.load(file_name)
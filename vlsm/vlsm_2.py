@@ -1,9 +1,12 @@
+import argparse
+import time
+
 def ip_to_int(ip):
     octets = map(int, ip.split('.'))
     return sum([octet << (8 * (3 - i)) for i, octet in enumerate(octets)])
 
 def int_to_ip(int_val):
-    return '.'.join(str((int_val >> (8 * i)) & 0xFF) for i in reversed(range(4)))
+    return f"{(int_val >> 24) & 0xFF}.{(int_val >> 16) & 0xFF}.{(int_val >> 8) & 0xFF}.{int_val & 0xFF}"
 
 def get_broadcast_address(network_address, subnet_mask):
     network_int = ip_to_int(network_address)
@@ -36,45 +39,158 @@ def parse_mask(input_mask):
     else:
         return input_mask, netmask_to_cidr(input_mask)
 
-def calculate_subnets(base_network, base_mask, sizes):
-    sizes.sort(reverse=True)      
+def prefix_length_for_hosts(size):
+    # Smallest block holding size hosts plus network and broadcast addresses:
+    # 2 ** (32 - p) >= size + 2  <=>  32 - p >= (size + 1).bit_length()
+    if size < 0:
+        raise ValueError(f"Subnet size must not be negative: {size}")
+    return 32 - (size + 1).bit_length()
+
+class Subnet:
+    """An IPv4 subnet kept as integers; dotted strings are only built when rendered."""
+    __slots__ = ('name', 'network', 'prefix_length')
+
+    def __init__(self, name, network, prefix_length):
+        self.name = name
+        self.network = network
+        self.prefix_length = prefix_length
+
+    @property
+    def size(self):
+        return 1 << (32 - self.prefix_length)
+
+    @property
+    def mask(self):
+        return (0xFFFFFFFF << (32 - self.prefix_length)) & 0xFFFFFFFF
+
+    @property
+    def broadcast(self):
+        return self.network | (self.size - 1)
+
+    @property
+    def first_host(self):
+        return self.network + 1
+
+    @property
+    def last_host(self):
+        return self.broadcast - 1
+
+    def __contains__(self, ip_int):
+        return self.network <= ip_int <= self.broadcast
+
+    def __repr__(self):
+        return f"Subnet({self.name!r}, {int_to_ip(self.network)}/{self.prefix_length})"
+
+    def as_tuple(self):
+        return (self.name, int_to_ip(self.network), int_to_ip(self.mask), self.prefix_length)
+
+    def render(self):
+        network = int_to_ip(self.network)
+        return (f"{self.name}: {network}/{self.prefix_length} (Netmask: {int_to_ip(self.mask)}, CIDR: /{self.prefix_length})\n"
+                f"First useful host: {int_to_ip(self.first_host)}\n"
+                f"Last useful host: {int_to_ip(self.last_host)}\n"
+                f"Broadcast address: {int_to_ip(self.broadcast)}")
+
+def check_base_block(base_network_int, base_prefix_length):
+    """Return the end (exclusive) of the base block, raising ValueError if it is not a network address."""
+    block_size = 1 << (32 - base_prefix_length)
+    if base_network_int & (block_size - 1):
+        raise ValueError(f"{int_to_ip(base_network_int)} is not the network address of a /{base_prefix_length}")
+    return base_network_int + block_size
+
+def plan_subnets(base_network_int, sizes, base_prefix_length=None):
+    """Allocate subnets for sizes (largest first) upward from base_network_int, returning Subnet objects.
+
+    When base_prefix_length is given, raises ValueError if the subnets do not fit in the base block.
+    """
     subnets = []
-    current_base = ip_to_int(base_network)
-    base_mask, _ = parse_mask(base_mask)
-    subnet_number = 1
+    current_base = base_network_int
+    base_end = check_base_block(base_network_int, base_prefix_length) if base_prefix_length is not None else None
+
+    for subnet_number, size in enumerate(sorted(sizes, reverse=True), 1):
+        prefix_length = prefix_length_for_hosts(size)
+        subnets.append(Subnet(f"Network {subnet_number}", current_base, prefix_length))
+        current_base += 1 << (32 - prefix_length)
+
+    if base_end is not None and current_base > base_end:
+        needed = current_base - base_network_int
+        raise ValueError(f"Subnets need {needed} addresses but /{base_prefix_length} only has {base_end - base_network_int}")
 
-    for size in sizes:
+    return subnets
+
+def calculate_subnets(base_network, base_mask, sizes):
+    sizes.sort(reverse=True)
+    _, base_prefix_length = parse_mask(base_mask)
+    return [subnet.as_tuple() for subnet in plan_subnets(ip_to_int(base_network), sizes, base_prefix_length)]
+
+def legacy_report(base_network, base_mask, sizes):
+    # The original string round-trip pipeline, kept as the benchmark baseline
+    sizes = sorted(sizes, reverse=True)
+    current_base = ip_to_int(base_network)
+    lines = []
+    for subnet_number, size in enumerate(sizes, 1):
         new_prefix_length = 32
-        while 2 ** (32 - new_prefix_length) < size + 2:  # +2 for network and broadcast address
+        while 2 ** (32 - new_prefix_length) < size + 2:
             new_prefix_length -= 1
+        mask = subnet_mask_from_prefix_length(new_prefix_length)
+        network = int_to_ip(current_base)
+        current_base += 2 ** (32 - new_prefix_length)
+        network_address = get_network_address(network, mask)
+        broadcast_address = get_broadcast_address(network, mask)
+        first_host = int_to_ip(ip_to_int(network_address) + 1)
+        last_host = int_to_ip(ip_to_int(broadcast_address) - 1)
+        lines.append(f"Network {subnet_number}: {network}/{new_prefix_length} (Netmask: {mask}, CIDR: /{new_prefix_length})\n"
+                     f"First useful host: {first_host}\n"
+                     f"Last useful host: {last_host}\n"
+                     f"Broadcast address: {broadcast_address}")
+    return lines
 
-        new_mask = subnet_mask_from_prefix_length(new_prefix_length)
-        subnet_network = int_to_ip(current_base)
-        subnets.append((f"Network {subnet_number}", subnet_network, new_mask, new_prefix_length))
+def benchmark(count, repeat=3):
+    """Time planning and rendering count subnets with the legacy string pipeline and with Subnet objects."""
+    sizes = [(i * 37) % 250 + 1 for i in range(count)]  # /24 or smaller, so 100k subnets fit in 10.0.0.0/8
+    base = '10.0.0.0'
 
-        current_base += 2 ** (32 - new_prefix_length)
-        subnet_number += 1
+    def best(func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
 
-    return subnets
+    legacy = best(lambda: legacy_report(base, '/8', sizes))
+    plan_only = best(lambda: plan_subnets(ip_to_int(base), sizes))
+    rendered = best(lambda: [subnet.render() for subnet in plan_subnets(ip_to_int(base), sizes)])
+    assert legacy_report(base, '/8', sizes) == [subnet.render() for subnet in plan_subnets(ip_to_int(base), sizes)]
+
+    print(f"{count} subnets, best of {repeat}")
+    print(f"Legacy string pipeline:   {legacy:8.3f} s")
+    print(f"Integer plan only:        {plan_only:8.3f} s  ({legacy / plan_only:5.1f}x)")
+    print(f"Integer plan + rendering: {rendered:8.3f} s  ({legacy / rendered:5.1f}x)")
 
 def main():
+    parser = argparse.ArgumentParser(description="VLSM subnet calculator")
+    parser.add_argument('--benchmark', type=int, metavar='N', help="Benchmark planning N subnets and exit")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+        return
+
     base_network = input("Insert base network IP:  ")
     base_mask = input("Insert subnet mask:  ")
     sizes = [int(s) for s in input("Insert subnets sizes separated by ',': ").split(',')]
 
-    parsed_mask, base_prefix_length = parse_mask(base_mask)
-    subnets = calculate_subnets(base_network, parsed_mask, sizes)
+    _, base_prefix_length = parse_mask(base_mask)
+    try:
+        subnets = plan_subnets(ip_to_int(base_network), sizes, base_prefix_length)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
 
-    for subnet_number, network, mask, prefix_length in subnets:
-        network_address = get_network_address(network, mask)
-        broadcast_address = get_broadcast_address(network, mask)
-        first_host = int_to_ip(ip_to_int(network_address) + 1)
-        last_host = int_to_ip(ip_to_int(broadcast_address) - 1)
+    for subnet in subnets:
         print(f"{'-' * 70}")
-        print(f"{subnet_number}: {network}/{prefix_length} (Netmask: {mask}, CIDR: /{prefix_length})\n"
-              f"First useful host: {first_host}\n"
-              f"Last useful host: {last_host}\n"
-              f"Broadcast address: {broadcast_address}\n"
+        print(f"{subnet.render()}\n"
               f"{'-' * 70}")
 
 if __name__ == '__main__':
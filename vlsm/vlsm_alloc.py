@@ -0,0 +1,329 @@
+import argparse
+import heapq
+import ipaddress
+import json
+import time
+
+from vlsm_2 import int_to_ip, ip_to_int
+
+# Free-space allocator for a base block that already has used ranges.
+#
+# Free space is kept buddy-style: one set (plus a min-heap for "lowest address first") of free
+# aligned blocks per prefix length. Allocating splits the smallest free block that fits, freeing
+# merges a block with its buddy, and looking up an address masks it at each prefix length.
+# Every operation touches at most one entry per prefix length, so cost is O(address bits * log n).
+
+def parse_address(text):
+    """Return (int, bits) for an IPv4 or IPv6 address string."""
+    if ':' in text:
+        return int(ipaddress.IPv6Address(text)), 128
+    return ip_to_int(text), 32
+
+def format_address(value, bits):
+    return int_to_ip(value) if bits == 32 else str(ipaddress.IPv6Address(value))
+
+def parse_cidr(text):
+    network, _, prefix_length = text.partition('/')
+    network, bits = parse_address(network)
+    return network, int(prefix_length) if prefix_length else bits, bits
+
+class AddressIndex:
+    """Allocation index over one IPv4 or IPv6 base block."""
+
+    def __init__(self, base_network, base_prefix_length, bits=32):
+        self.bits = bits
+        self.base_network = base_network
+        self.base_prefix_length = base_prefix_length
+        if base_network & (self.block_size(base_prefix_length) - 1):
+            raise ValueError(f"{format_address(base_network, bits)} is not the network address of a /{base_prefix_length}")
+        self.free_blocks = [set() for _ in range(bits + 1)]
+        self.free_heaps = [[] for _ in range(bits + 1)]
+        self.allocated = {}  # network -> (prefix_length, name)
+        self.add_free(base_network, base_prefix_length)
+
+    @classmethod
+    def from_cidr(cls, cidr):
+        network, prefix_length, bits = parse_cidr(cidr)
+        return cls(network, prefix_length, bits)
+
+    def block_size(self, prefix_length):
+        return 1 << (self.bits - prefix_length)
+
+    def mask(self, prefix_length):
+        return ((1 << self.bits) - 1) ^ (self.block_size(prefix_length) - 1)
+
+    def cidr(self, network, prefix_length):
+        return f"{format_address(network, self.bits)}/{prefix_length}"
+
+    def parse_cidr(self, text):
+        """Return (network, prefix_length) for a CIDR of this index's address family."""
+        network, prefix_length, bits = parse_cidr(text)
+        if bits != self.bits:
+            raise ValueError(f"{text} is not an IPv{4 if self.bits == 32 else 6} network")
+        return network, prefix_length
+
+    def in_base(self, address):
+        """True if address is a value of this family inside the base block."""
+        shift = self.bits - self.base_prefix_length
+        return 0 <= address < 1 << self.bits and address >> shift == self.base_network >> shift
+
+    def prefix_length_for_hosts(self, hosts):
+        # Same rule as vlsm_2.prefix_length_for_hosts: room for the hosts plus network and broadcast
+        return self.bits - (hosts + 1).bit_length()
+
+    # Free block bookkeeping
+
+    def add_free(self, network, prefix_length):
+        self.free_blocks[prefix_length].add(network)
+        heap = self.free_heaps[prefix_length]
+        heapq.heappush(heap, network)
+        if len(heap) > 2 * len(self.free_blocks[prefix_length]) + 64:
+            # Drop stale heap entries left behind by discard_free
+            self.free_heaps[prefix_length] = heap = list(self.free_blocks[prefix_length])
+            heapq.heapify(heap)
+
+    def discard_free(self, network, prefix_length):
+        # The heap entry goes stale and is skipped by pop_lowest_free
+        self.free_blocks[prefix_length].discard(network)
+
+    def pop_lowest_free(self, prefix_length):
+        blocks = self.free_blocks[prefix_length]
+        heap = self.free_heaps[prefix_length]
+        while heap:
+            network = heapq.heappop(heap)
+            if network in blocks:
+                blocks.remove(network)
+                return network
+        return None
+
+    def split(self, network, prefix_length, target_prefix_length, keep):
+        """Split a free block down to target_prefix_length, returning the piece containing keep."""
+        while prefix_length < target_prefix_length:
+            prefix_length += 1
+            upper = network | self.block_size(prefix_length)
+            if keep >= upper:
+                self.add_free(network, prefix_length)
+                network = upper
+            else:
+                self.add_free(upper, prefix_length)
+        return network
+
+    # Public operations
+
+    def allocate(self, prefix_length, name=''):
+        """Allocate the lowest free aligned block among the smallest free blocks that fit."""
+        if not self.base_prefix_length <= prefix_length <= self.bits:
+            raise ValueError(f"/{prefix_length} does not fit in the /{self.base_prefix_length} base block")
+        for candidate in range(prefix_length, self.base_prefix_length - 1, -1):
+            network = self.pop_lowest_free(candidate)
+            if network is not None:
+                network = self.split(network, candidate, prefix_length, network)
+                self.allocated[network] = (prefix_length, name)
+                return network
+        raise ValueError(f"No free /{prefix_length} block left in {self.cidr(self.base_network, self.base_prefix_length)}")
+
+    def allocate_hosts(self, hosts, name=''):
+        return self.allocate(self.prefix_length_for_hosts(hosts), name)
+
+    def reserve(self, network, prefix_length, name=''):
+        """Mark an existing network/prefix_length as used, raising ValueError if it overlaps anything."""
+        if not self.base_prefix_length <= prefix_length <= self.bits or not self.in_base(network):
+            raise ValueError(f"{self.cidr(network, prefix_length)} is outside the "
+                             f"{self.cidr(self.base_network, self.base_prefix_length)} base block")
+        if network & (self.block_size(prefix_length) - 1):
+            raise ValueError(f"{self.cidr(network, prefix_length)} is not aligned")
+        for candidate in range(prefix_length, self.base_prefix_length - 1, -1):
+            container = network & self.mask(candidate)
+            if container in self.free_blocks[candidate]:
+                self.discard_free(container, candidate)
+                self.split(container, candidate, prefix_length, network)
+                self.allocated[network] = (prefix_length, name)
+                return network
+        raise ValueError(f"{self.cidr(network, prefix_length)} overlaps an allocation")
+
+    def free(self, network):
+        """Release the allocation starting at network, merging it with free buddies."""
+        if network not in self.allocated:
+            raise ValueError(f"{format_address(network, self.bits)} is not allocated")
+        prefix_length, _ = self.allocated.pop(network)
+        while prefix_length > self.base_prefix_length:
+            buddy = network ^ self.block_size(prefix_length)
+            if buddy not in self.free_blocks[prefix_length]:
+                break
+            self.discard_free(buddy, prefix_length)
+            network &= buddy
+            prefix_length -= 1
+        self.add_free(network, prefix_length)
+
+    def lookup(self, address):
+        """Return (network, prefix_length, name) of the allocation containing address, or None."""
+        if not self.in_base(address):
+            return None
+        for prefix_length in range(self.bits, self.base_prefix_length - 1, -1):
+            network = address & self.mask(prefix_length)
+            entry = self.allocated.get(network)
+            if entry is not None and entry[0] == prefix_length:
+                return network, prefix_length, entry[1]
+        return None
+
+    def stats(self):
+        free_by_prefix = {prefix_length: len(blocks) for prefix_length, blocks in enumerate(self.free_blocks) if blocks}
+        free_addresses = sum(count * self.block_size(prefix_length) for prefix_length, count in free_by_prefix.items())
+        largest = min(free_by_prefix) if free_by_prefix else None
+        largest_size = self.block_size(largest) if largest is not None else 0
+        return {
+            'base': self.cidr(self.base_network, self.base_prefix_length),
+            'allocations': len(self.allocated),
+            'allocated_addresses': self.block_size(self.base_prefix_length) - free_addresses,
+            'free_addresses': free_addresses,
+            'free_blocks': sum(free_by_prefix.values()),
+            'free_blocks_by_prefix': {f"/{prefix_length}": count for prefix_length, count in sorted(free_by_prefix.items())},
+            'largest_free_block': f"/{largest}" if largest is not None else None,
+            # 0 when all free space is one block, approaching 1 as it shatters into small pieces
+            'fragmentation': round(1 - largest_size / free_addresses, 4) if free_addresses else 0.0,
+        }
+
+    # Persistence
+
+    def to_dict(self):
+        return {
+            'base': self.cidr(self.base_network, self.base_prefix_length),
+            'allocations': [[self.cidr(network, prefix_length), name]
+                            for network, (prefix_length, name) in sorted(self.allocated.items())],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls.from_cidr(data['base'])
+        for cidr, name in data['allocations']:
+            network, prefix_length = index.parse_cidr(cidr)
+            index.reserve(network, prefix_length, name)
+        return index
+
+    def save(self, file_name):
+        with open(file_name, 'w') as file:
+            json.dump(self.to_dict(), file)
+
+    @classmethod
+    def load(cls, file_name):
+        with open(file_name, 'r') as file:
+            return cls.from_dict(json.load(file))
+
+def benchmark(count, base='10.0.0.0/8'):
+    """Time count allocations, count/2 frees and count lookups on an index."""
+    index = AddressIndex.from_cidr(base)
+    prefixes = [index.bits - 2 - (i * 7) % 6 for i in range(count)]  # /26 to /30 blocks on IPv4
+
+    start = time.perf_counter()
+    networks = [index.allocate(prefix_length) for prefix_length in prefixes]
+    allocate_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for network in networks:
+        index.lookup(network + 1)
+    lookup_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for network in networks[::2]:
+        index.free(network)
+    free_time = time.perf_counter() - start
+
+    print(f"{count} allocations in {base}")
+    print(f"allocate: {allocate_time:7.3f} s  ({count / allocate_time:10.0f} ops/s)")
+    print(f"lookup:   {lookup_time:7.3f} s  ({count / lookup_time:10.0f} ops/s)")
+    print(f"free:     {free_time:7.3f} s  ({len(networks[::2]) / free_time:10.0f} ops/s)")
+    print(json.dumps(index.stats(), indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocate free subnets from a base block with existing allocations")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    init = subparsers.add_parser('init', help="Create an index file for a base block")
+    init.add_argument('index', help="Index file (JSON)")
+    init.add_argument('base', help="Base block, e.g. 10.0.0.0/8 or 2001:db8::/32")
+    init.add_argument('--existing', help="File with one used CIDR per line (optionally followed by a name)")
+
+    allocate = subparsers.add_parser('allocate', help="Allocate subnets (largest first)")
+    allocate.add_argument('index', help="Index file (JSON)")
+    group = allocate.add_mutually_exclusive_group(required=True)
+    group.add_argument('--hosts', type=int, nargs='+', help="Host counts to allocate")
+    group.add_argument('--prefix', type=int, nargs='+', help="Prefix lengths to allocate")
+    allocate.add_argument('--name', default='', help="Name stored with the allocations")
+
+    for name, help_text in (('reserve', "Mark CIDRs as used"), ('free', "Release allocations")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('index', help="Index file (JSON)")
+        sub.add_argument('cidrs', nargs='+', help="Allocations (network/prefix)")
+
+    lookup = subparsers.add_parser('lookup', help="Find the allocation containing addresses")
+    lookup.add_argument('index', help="Index file (JSON)")
+    lookup.add_argument('addresses', nargs='+', help="Addresses to look up")
+
+    stats = subparsers.add_parser('stats', help="Show usage and fragmentation")
+    stats.add_argument('index', help="Index file (JSON)")
+
+    bench = subparsers.add_parser('benchmark', help="Benchmark allocate/lookup/free")
+    bench.add_argument('count', type=int, help="Number of allocations")
+    bench.add_argument('--base', default='10.0.0.0/8', help="Base block")
+
+    args = parser.parse_args()
+
+    try:
+        run(args)
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+
+def run(args):
+    if args.command == 'benchmark':
+        benchmark(args.count, args.base)
+        return
+
+    if args.command == 'init':
+        index = AddressIndex.from_cidr(args.base)
+        if args.existing:
+            with open(args.existing, 'r') as file:
+                for line in file:
+                    fields = line.split('#')[0].split()
+                    if fields:
+                        network, prefix_length = index.parse_cidr(fields[0])
+                        index.reserve(network, prefix_length, ' '.join(fields[1:]))
+        index.save(args.index)
+        print(f"Created {args.index} for {args.base} with {len(index.allocated)} existing allocations")
+        return
+
+    index = AddressIndex.load(args.index)
+
+    if args.command == 'allocate':
+        if args.hosts:
+            prefixes = [index.prefix_length_for_hosts(hosts) for hosts in args.hosts]
+        else:
+            prefixes = args.prefix
+        for prefix_length in sorted(prefixes):
+            print(index.cidr(index.allocate(prefix_length, args.name), prefix_length))
+        index.save(args.index)
+    elif args.command == 'reserve':
+        for cidr in args.cidrs:
+            network, prefix_length = index.parse_cidr(cidr)
+            index.reserve(network, prefix_length)
+        index.save(args.index)
+    elif args.command == 'free':
+        for cidr in args.cidrs:
+            network, _ = index.parse_cidr(cidr)
+            index.free(network)
+        index.save(args.index)
+    elif args.command == 'lookup':
+        for address in args.addresses:
+            value, bits = parse_address(address)
+            found = index.lookup(value) if bits == index.bits else None
+            if found:
+                network, prefix_length, name = found
+                print(f"{address}: {index.cidr(network, prefix_length)}" + (f" ({name})" if name else ""))
+            elif bits == index.bits and index.in_base(value):
+                print(f"{address}: free")
+            else:
+                print(f"{address}: outside {index.cidr(index.base_network, index.base_prefix_length)}")
+    elif args.command == 'stats':
+        print(json.dumps(index.stats(), indent=2))
+
+if __name__ == '__main__':
+    main()
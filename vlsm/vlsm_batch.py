@@ -0,0 +1,213 @@
+import argparse
+import csv
+import sys
+
+import numpy as np
+
+from vlsm_2 import int_to_ip, ip_to_int, parse_mask
+
+# Bulk address math on uint32 arrays.
+# Every function takes and returns NumPy arrays so millions of addresses are handled per call.
+
+CHUNK_SIZE = 100000  # CSV rows per chunk
+
+def ips_to_array(ips):
+    """Convert an iterable of dotted IPv4 strings to a uint32 array."""
+    ips = list(ips)
+    if not ips:
+        return np.empty(0, dtype=np.uint32)
+    # Parse the bytes of 'a.b.c.d.a.b.c.d.' at once: every address must end up as exactly four dot-terminated
+    # tokens of one to three digits, so no per-address Python work is needed
+    data = np.frombuffer(('.'.join(ips) + '.').encode('ascii', errors='replace'), dtype=np.uint8)
+    ends = np.cumsum(np.fromiter(map(len, ips), dtype=np.int64, count=len(ips)) + 1) - 1
+    is_dot = data == ord('.')
+    dots = np.flatnonzero(is_dot)
+    valid = np.bincount(np.searchsorted(ends, dots), minlength=len(ips)) == 4
+    valid[np.searchsorted(ends, np.flatnonzero(~is_dot & ((data < ord('0')) | (data > ord('9')))))] = False
+    if valid.all():
+        lengths = np.diff(dots, prepend=-1) - 1
+        valid = ((lengths >= 1) & (lengths <= 3)).reshape(-1, 4).all(axis=1)
+    if not valid.all():
+        raise ValueError(f"Invalid IPv4 address: {ips[int(np.argmin(valid))]!r}")
+    octets = np.zeros(len(dots), dtype=np.int64)
+    for place, scale in enumerate((1, 10, 100)):
+        digits = data[dots - 1 - place].astype(np.int64) - ord('0')
+        octets += np.where(lengths > place, digits * scale, 0)
+    octets = octets.reshape(-1, 4)
+    if octets.max() > 255:
+        raise ValueError(f"Invalid IPv4 address: {ips[int(np.argmax(octets.max(axis=1) > 255))]!r}")
+    return ((octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]).astype(np.uint32)
+
+def array_to_ips(addresses):
+    """Convert a uint32 array back to an array of dotted IPv4 strings."""
+    addresses = np.asarray(addresses, dtype=np.uint32)
+    parts = [((addresses >> shift) & 0xFF).astype(str) for shift in (24, 16, 8, 0)]
+    result = parts[0]
+    for part in parts[1:]:
+        result = np.char.add(np.char.add(result, '.'), part)
+    return result
+
+def prefix_to_mask(prefix_lengths):
+    prefix_lengths = np.asarray(prefix_lengths, dtype=np.int64)
+    if prefix_lengths.size and (prefix_lengths.min() < 0 or prefix_lengths.max() > 32):
+        raise ValueError("Prefix lengths must be between 0 and 32")
+    prefix_lengths = prefix_lengths.astype(np.uint64)
+    # Shift in 64 bits so /0 does not hit the undefined 32-bit shift
+    return ((np.uint64(0xFFFFFFFF) << (np.uint64(32) - prefix_lengths)) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+def mask_to_prefix(masks):
+    masks = np.asarray(masks, dtype=np.uint32)
+    bits = np.unpackbits(np.ascontiguousarray(masks).view(np.uint8).reshape(-1, 4), axis=1)
+    return bits.sum(axis=1).astype(np.uint8).reshape(masks.shape)
+
+def masks_to_array(masks):
+    """Convert mask strings ('255.255.255.0', '/24' or '24') to a uint32 array of netmasks."""
+    masks = list(masks)
+    if masks and all(mask.lstrip('/').isdigit() for mask in masks):
+        return prefix_to_mask([int(mask.lstrip('/')) for mask in masks])
+    masks = ips_to_array(parse_mask(mask if '.' in mask else '/' + mask)[0] for mask in masks)
+    # A netmask is a run of ones followed by zeros, e.g. 255.0.255.0 is rejected
+    valid = prefix_to_mask(mask_to_prefix(masks)) == masks
+    if not valid.all():
+        raise ValueError(f"Invalid netmask: {int_to_ip(int(masks[np.argmin(valid)]))}")
+    return masks
+
+def network_addresses(addresses, masks):
+    return np.bitwise_and(addresses, masks, dtype=np.uint32)
+
+def broadcast_addresses(addresses, masks):
+    return np.bitwise_or(addresses, np.invert(np.asarray(masks, dtype=np.uint32)), dtype=np.uint32)
+
+def host_ranges(addresses, masks):
+    """Return (first_host, last_host) arrays, matching Subnet.first_host/last_host."""
+    first = network_addresses(addresses, masks) + np.uint32(1)
+    last = broadcast_addresses(addresses, masks) - np.uint32(1)
+    return first, last
+
+def in_subnet(addresses, network, mask):
+    """Boolean array telling which addresses fall inside network/mask."""
+    return np.bitwise_and(addresses, np.uint32(mask)) == np.uint32(network & mask)
+
+def flatten_prefixes(prefixes):
+    """Turn (network, prefix_length) pairs into disjoint (start, prefix index) ranges covering 0..2**32-1.
+
+    Nested prefixes are allowed: each range maps to its most specific prefix, or -1 for unassigned space.
+    """
+    order = sorted(range(len(prefixes)), key=lambda i: (prefixes[i][0], prefixes[i][1]))
+    starts = [0]
+    values = [-1]
+    stack = []  # (last address, prefix index) of the prefixes containing the current position
+
+    def emit(start, value):
+        if starts[-1] == start:
+            starts.pop()
+            values.pop()
+        if values and values[-1] == value:
+            return
+        starts.append(start)
+        values.append(value)
+
+    def close_before(address):
+        while stack and stack[-1][0] < address:
+            end, _ = stack.pop()
+            if end < 0xFFFFFFFF:
+                emit(end + 1, stack[-1][1] if stack else -1)
+
+    for index in order:
+        network, prefix_length = prefixes[index]
+        network &= (0xFFFFFFFF << (32 - prefix_length)) & 0xFFFFFFFF
+        close_before(network)
+        emit(network, index)
+        stack.append((network | (0xFFFFFFFF >> prefix_length), index))
+    close_before(1 << 32)
+
+    return np.array(starts, dtype=np.uint32), np.array(values, dtype=np.int32)
+
+def assign_subnets(addresses, starts, values):
+    """Index of the most specific subnet containing each address, or -1.
+
+    starts and values come from flatten_prefixes, so subnets may overlap or nest, e.g. a CIDR list holding
+    both 10.0.0.0/8 and 10.1.0.0/16. Flatten once and reuse them for every chunk.
+    """
+    return values[np.searchsorted(starts, addresses, side='right') - 1]
+
+# Streaming CSV
+
+def read_csv_chunks(file_name, ip_column='ip', mask_column='mask', default_mask=None, chunk_size=CHUNK_SIZE):
+    """Yield (rows, addresses, masks) for consecutive chunks of a CSV file with a header row."""
+    with open(file_name, 'r', newline='') as file:
+        reader = csv.DictReader(file)
+        while True:
+            rows = [row for _, row in zip(range(chunk_size), reader)]
+            if not rows:
+                return
+            addresses = ips_to_array(row[ip_column].strip() for row in rows)
+            if mask_column in rows[0]:
+                masks = masks_to_array(row[mask_column].strip() for row in rows)
+            elif default_mask is not None:
+                masks = np.full(len(rows), masks_to_array([default_mask])[0], dtype=np.uint32)
+            else:
+                raise ValueError(f"Column '{mask_column}' not found and no default mask given")
+            yield rows, addresses, masks
+
+def classify_csv(in_file, out_file, ip_column='ip', mask_column='mask', default_mask=None, subnets=None,
+                 chunk_size=CHUNK_SIZE):
+    """Stream in_file to out_file, adding network, broadcast, host range and optional subnet columns."""
+    if subnets:
+        subnet_starts, subnet_values = flatten_prefixes(subnets)
+        subnet_names = np.array([f"{int_to_ip(network)}/{prefix}" for network, prefix in subnets] + [''])
+    total = 0
+    writer = None
+    for rows, addresses, masks in read_csv_chunks(in_file, ip_column, mask_column, default_mask, chunk_size):
+        first, last = host_ranges(addresses, masks)
+        columns = {
+            'network': array_to_ips(network_addresses(addresses, masks)),
+            'prefix_length': mask_to_prefix(masks),
+            'broadcast': array_to_ips(broadcast_addresses(addresses, masks)),
+            'first_host': array_to_ips(first),
+            'last_host': array_to_ips(last),
+        }
+        if subnets:
+            columns['subnet'] = subnet_names[assign_subnets(addresses, subnet_starts, subnet_values)]
+
+        if writer is None:
+            writer = csv.writer(out_file)
+            writer.writerow(list(rows[0].keys()) + list(columns))
+        values = list(columns.values())
+        writer.writerows(list(row.values()) + [str(column[i]) for column in values] for i, row in enumerate(rows))
+        total += len(rows)
+    return total
+
+def read_cidrs(file_name):
+    subnets = []
+    with open(file_name, 'r') as file:
+        for line in file:
+            line = line.split('#')[0].strip()
+            if line:
+                network, _, prefix_length = line.partition('/')
+                subnets.append((ip_to_int(network), int(prefix_length or 32)))
+    return subnets
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk IPv4 address classification")
+    parser.add_argument('input', help="CSV file with a header row")
+    parser.add_argument('-o', '--output', help="Output CSV (default: stdout)")
+    parser.add_argument('--ip-column', default='ip', help="Column holding addresses (default: ip)")
+    parser.add_argument('--mask-column', default='mask', help="Column holding masks (default: mask)")
+    parser.add_argument('--mask', help="Mask used when the mask column is missing, e.g. /24")
+    parser.add_argument('--subnets', help="File with one CIDR per line; adds the containing subnet as a column")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows processed per chunk")
+    args = parser.parse_args()
+
+    subnets = read_cidrs(args.subnets) if args.subnets else None
+    out_file = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        total = classify_csv(args.input, out_file, args.ip_column, args.mask_column, args.mask, subnets,
+                             args.chunk_size)
+    finally:
+        if args.output:
+            out_file.close()
+    print(f"Classified {total} addresses", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
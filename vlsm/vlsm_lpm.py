@@ -0,0 +1,218 @@
+import argparse
+import bisect
+import csv
+import json
+import mmap
+import random
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from vlsm_2 import int_to_ip, ip_to_int
+from vlsm_batch import flatten_prefixes, ips_to_array
+
+# Longest-prefix-match table for IPv4.
+#
+# Possibly nested prefixes are flattened into disjoint ranges, each mapped to its most specific
+# prefix (or -1 for unassigned space). A lookup is then one binary search over the sorted range
+# starts. The table file stores both arrays raw so it can be mmap-loaded without parsing.
+
+CHUNK_SIZE = 1000000  # addresses per batch lookup chunk
+
+MAGIC = b'LPMT'
+VERSION = 1
+HEADER = struct.Struct('<4sBxxxQQ')  # magic, version, range count, names blob length
+
+class LPMTable:
+    """Maps IPv4 addresses to the longest matching prefix from a plan or CIDR list."""
+
+    def __init__(self, starts, values, names):
+        self.starts = starts
+        self.values = values
+        self._names = names  # one label per prefix index, or the raw JSON bytes until first use
+        self._mapped = None
+        # Plain int views for single lookups: bisect on a memoryview avoids NumPy's per-call overhead
+        self._start_view = memoryview(np.ascontiguousarray(starts, dtype=np.uint32)).cast('B').cast('I')
+        self._value_view = memoryview(np.ascontiguousarray(values, dtype=np.int32)).cast('B').cast('i')
+
+    @property
+    def names(self):
+        if isinstance(self._names, (bytes, memoryview)):
+            self._names = json.loads(bytes(self._names).decode('utf-8'))
+        return self._names
+
+    @classmethod
+    def build(cls, entries):
+        """Build from (network, prefix_length, name) entries."""
+        entries = list(entries)
+        starts, values = flatten_prefixes([(network, prefix_length) for network, prefix_length, _ in entries])
+        return cls(starts, values, [name or f"{int_to_ip(network)}/{prefix_length}" for network, prefix_length, name in entries])
+
+    @classmethod
+    def from_subnets(cls, subnets):
+        """Build from vlsm_2.Subnet objects, e.g. the result of plan_subnets."""
+        return cls.build((subnet.network, subnet.prefix_length, subnet.name) for subnet in subnets)
+
+    def lookup_index(self, address):
+        return self._value_view[bisect.bisect_right(self._start_view, address) - 1]
+
+    def lookup(self, address):
+        """Return the label of the longest prefix containing address, or None."""
+        index = self.lookup_index(address)
+        return self.names[index] if index >= 0 else None
+
+    def lookup_many(self, addresses):
+        """Prefix indexes (-1 when unmatched) for a uint32 array of addresses."""
+        return self.values[np.searchsorted(self.starts, addresses, side='right') - 1]
+
+    def save(self, file_name):
+        names = json.dumps(self.names).encode('utf-8')
+        with open(file_name, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, len(self.starts), len(names)))
+            file.write(self.starts.astype('<u4').tobytes())
+            file.write(self.values.astype('<i4').tobytes())
+            file.write(names)
+
+    @classmethod
+    def load(cls, file_name):
+        """Map a saved table into memory; the range arrays are views over the file, not copies."""
+        with open(file_name, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, names_length = HEADER.unpack_from(mapped)
+        if magic != MAGIC:
+            mapped.close()
+            raise ValueError(f"{file_name} is not an LPM table")
+        if version != VERSION:
+            mapped.close()
+            raise ValueError(f"Unsupported LPM table version: {version}")
+        offset = HEADER.size
+        starts = np.frombuffer(mapped, dtype='<u4', count=count, offset=offset)
+        values = np.frombuffer(mapped, dtype='<i4', count=count, offset=offset + 4 * count)
+        names_offset = offset + 8 * count
+        table = cls(starts, values, mapped[names_offset:names_offset + names_length])
+        table._mapped = mapped
+        return table
+
+# Input readers
+
+def read_cidr_entries(file_name):
+    """Read 'network/prefix [name]' lines."""
+    with open(file_name, 'r') as file:
+        for line in file:
+            fields = line.split('#')[0].split()
+            if fields:
+                network, _, prefix_length = fields[0].partition('/')
+                yield ip_to_int(network), int(prefix_length or 32), ' '.join(fields[1:])
+
+def read_plan_entries(file_name):
+    """Read the CSV written by vlsm_planner.py (path, network, prefix_length columns)."""
+    with open(file_name, 'r', newline='') as file:
+        for row in csv.DictReader(file):
+            if row.get('network'):
+                yield ip_to_int(row['network']), int(row['prefix_length']), row.get('path', '')
+
+def read_address_chunks(file, chunk_size=CHUNK_SIZE):
+    while True:
+        lines = [line.strip() for _, line in zip(range(chunk_size), file)]
+        if not lines:
+            return
+        lines = [line for line in lines if line]
+        if lines:
+            yield lines
+
+def benchmark(prefix_count, lookup_count):
+    """Time building, saving, mmap-loading and querying a table of random nested prefixes."""
+    random.seed(0)
+    entries = []
+    for _ in range(prefix_count):
+        prefix_length = random.randint(8, 30)
+        network = random.getrandbits(32) & ((0xFFFFFFFF << (32 - prefix_length)) & 0xFFFFFFFF)
+        entries.append((network, prefix_length, ''))
+    addresses = np.random.default_rng(0).integers(0, 1 << 32, lookup_count, dtype=np.uint32)
+
+    start = time.perf_counter()
+    table = LPMTable.build(entries)
+    build_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = f"{directory}/benchmark.tbl"
+        table.save(file_name)
+        start = time.perf_counter()
+        table = LPMTable.load(file_name)
+        load_time = time.perf_counter() - start
+
+    single = [int(address) for address in addresses[:100000]]
+    start = time.perf_counter()
+    for address in single:
+        table.lookup(address)
+    single_rate = len(single) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    table.lookup_many(addresses)
+    batch_rate = lookup_count / (time.perf_counter() - start)
+
+    print(f"{prefix_count} prefixes -> {len(table.starts)} ranges")
+    print(f"build:          {build_time:8.3f} s")
+    print(f"mmap load:      {load_time * 1000:8.3f} ms")
+    print(f"single lookups: {single_rate:12.0f} /s")
+    print(f"batch lookups:  {batch_rate:12.0f} /s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Longest-prefix-match lookups against a VLSM plan or CIDR list")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Compile a table file")
+    build.add_argument('table', help="Output table file")
+    source = build.add_mutually_exclusive_group(required=True)
+    source.add_argument('--cidrs', help="File with one 'network/prefix [name]' per line")
+    source.add_argument('--plan', help="CSV plan written by vlsm_planner.py")
+
+    lookup = subparsers.add_parser('lookup', help="Look up single addresses")
+    lookup.add_argument('table', help="Table file")
+    lookup.add_argument('addresses', nargs='+', help="IPv4 addresses")
+
+    batch = subparsers.add_parser('batch', help="Look up a file of addresses, one per line")
+    batch.add_argument('table', help="Table file")
+    batch.add_argument('input', help="Address file ('-' for stdin)")
+    batch.add_argument('-o', '--output', help="Output CSV (default: stdout)")
+    batch.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Addresses per chunk")
+
+    bench = subparsers.add_parser('benchmark', help="Report build time, load time and lookups/sec")
+    bench.add_argument('--prefixes', type=int, default=100000, help="Random prefixes in the table")
+    bench.add_argument('--lookups', type=int, default=1000000, help="Addresses to look up")
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        entries = read_cidr_entries(args.cidrs) if args.cidrs else read_plan_entries(args.plan)
+        table = LPMTable.build(entries)
+        table.save(args.table)
+        print(f"Saved {len(table.names)} prefixes ({len(table.starts)} ranges) to {args.table}")
+    elif args.command == 'lookup':
+        table = LPMTable.load(args.table)
+        for address in args.addresses:
+            print(f"{address}: {table.lookup(ip_to_int(address)) or 'no match'}")
+    elif args.command == 'batch':
+        table = LPMTable.load(args.table)
+        names = np.array(table.names + [''], dtype=object)  # index -1 maps to the trailing ''
+        in_file = open(args.input, 'r') if args.input != '-' else sys.stdin
+        out_file = open(args.output, 'w', newline='') if args.output else sys.stdout
+        try:
+            writer = csv.writer(out_file)
+            writer.writerow(['ip', 'match'])
+            for lines in read_address_chunks(in_file, args.chunk_size):
+                matches = names[table.lookup_many(ips_to_array(lines))]
+                writer.writerows(zip(lines, matches))
+        finally:
+            if args.input != '-':
+                in_file.close()
+            if args.output:
+                out_file.close()
+    elif args.command == 'benchmark':
+        benchmark(args.prefixes, args.lookups)
+
+if __name__ == '__main__':
+    main()
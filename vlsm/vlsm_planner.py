@@ -0,0 +1,189 @@
+import argparse
+import csv
+import json
+import sys
+from multiprocessing import Pool, cpu_count
+
+from vlsm_2 import Subnet, check_base_block, int_to_ip, ip_to_int, parse_mask, prefix_length_for_hosts
+
+# Hierarchical VLSM planning (region -> site -> VLAN) for many independent requirement sets.
+#
+# A requirement set is a tree of nodes. Leaves are {"name": ..., "hosts": N}; inner nodes list their
+# children under "children", "regions", "sites" or "vlans" ("vlans" may also be a {name: hosts} dict).
+# Each inner node gets the smallest aligned block that holds all of its children.
+
+CHILD_KEYS = ('children', 'regions', 'sites', 'vlans')
+OUTPUT_FIELDS = ['set', 'path', 'level', 'network', 'prefix_length', 'netmask',
+                 'first_host', 'last_host', 'broadcast', 'hosts', 'error']
+
+def node_children(node):
+    for key in CHILD_KEYS:
+        children = node.get(key)
+        if children is None:
+            continue
+        if isinstance(children, dict):
+            return [{'name': name, 'hosts': hosts} for name, hosts in children.items()]
+        return children
+    return None
+
+def size_tree(node):
+    """Return (name, hosts, prefix_length, children) with children sorted largest block first."""
+    children = node_children(node)
+    if children is None:
+        hosts = int(node['hosts'])
+        if hosts < 0:
+            raise ValueError(f"'{node.get('name', '?')}' has a negative host count: {hosts}")
+        return node.get('name', ''), hosts, prefix_length_for_hosts(hosts), []
+    if not children:
+        raise ValueError(f"'{node.get('name', '?')}' has no children")
+    # Placing children largest first keeps every child block aligned, so the total is exact
+    sized = sorted((size_tree(child) for child in children), key=lambda child: child[2])
+    total = sum(1 << (32 - child[2]) for child in sized)
+    return node.get('name', ''), '', 32 - (total - 1).bit_length(), sized
+
+def allocate(tree, network, path, level, subnets):
+    """Place a sized tree at network, appending (Subnet, level, hosts) for it and all its descendants."""
+    _, hosts, prefix_length, children = tree
+    subnets.append((Subnet(path, network, prefix_length), level, hosts))
+    current = network
+    for child in children:
+        allocate(child, current, f"{path}/{child[0]}", level + 1, subnets)
+        current += 1 << (32 - child[2])
+
+def plan_hierarchy(requirements):
+    """Plan one requirement set inside its 'base' block, raising ValueError if it does not fit."""
+    if not requirements.get('base'):
+        raise ValueError("No base block given")
+    base_network, _, base_mask = requirements['base'].partition('/')
+    _, base_prefix_length = parse_mask('/' + base_mask if base_mask.isdigit() else base_mask)
+    base_network_int = ip_to_int(base_network)
+    base_end = check_base_block(base_network_int, base_prefix_length)
+
+    tree = size_tree(requirements)
+    prefix_length = tree[2]
+    needed = 1 << (32 - prefix_length)
+    if prefix_length < base_prefix_length:
+        raise ValueError(f"Plan needs a /{prefix_length} ({needed} addresses) but the base is "
+                         f"/{base_prefix_length} ({base_end - base_network_int} addresses)")
+
+    subnets = []
+    allocate(tree, base_network_int, tree[0], 0, subnets)
+    return subnets
+
+def plan_rows(requirements):
+    """Worker entry point: plan one set and render it to output rows; errors become a single row."""
+    name = requirements.get('name', '')
+    try:
+        subnets = plan_hierarchy(requirements)
+    except (KeyError, TypeError, ValueError) as e:
+        return name, [{'set': name, 'error': str(e) or repr(e)}], False
+    rows = []
+    for subnet, level, hosts in subnets:
+        rows.append({
+            'set': name,
+            'path': subnet.name,
+            'level': level,
+            'network': int_to_ip(subnet.network),
+            'prefix_length': subnet.prefix_length,
+            'netmask': int_to_ip(subnet.mask),
+            'first_host': int_to_ip(subnet.first_host),
+            'last_host': int_to_ip(subnet.last_host),
+            'broadcast': int_to_ip(subnet.broadcast),
+            'hosts': hosts,
+            'error': '',
+        })
+    return name, rows, True
+
+def plan_many(requirement_sets, workers=None, chunksize=16):
+    """Plan independent requirement sets across a process pool, yielding (name, rows, ok) in input order."""
+    if workers is None:
+        workers = cpu_count()
+    if workers <= 1:
+        yield from map(plan_rows, requirement_sets)
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap(plan_rows, requirement_sets, chunksize=chunksize)
+
+# Input readers
+
+def read_json_sets(file_name):
+    """Read a JSON list of requirement sets, or JSON lines with one set per line."""
+    with open(file_name, 'r') as file:
+        first = file.read(1)
+        while first.isspace():
+            first = file.read(1)
+        file.seek(0)
+        if first == '[':
+            yield from json.load(file)
+            return
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+def read_csv_sets(file_name, default_base=None):
+    """Read CSV rows of set,base,region,site,vlan,hosts into requirement sets.
+
+    Rows of one set must be consecutive; base may be left empty after the first row or given by default_base.
+    """
+    with open(file_name, 'r', newline='') as file:
+        current = None
+        for row in csv.DictReader(file):
+            name = row['set']
+            if current is None or current['name'] != name:
+                if current is not None:
+                    yield current
+                current = {'name': name, 'base': row.get('base') or default_base, 'regions': []}
+            regions = current['regions']
+            if not regions or regions[-1]['name'] != row['region']:
+                regions.append({'name': row['region'], 'sites': []})
+            sites = regions[-1]['sites']
+            if not sites or sites[-1]['name'] != row['site']:
+                sites.append({'name': row['site'], 'vlans': []})
+            sites[-1]['vlans'].append({'name': row['vlan'], 'hosts': row['hosts']})
+        if current is not None:
+            yield current
+
+def read_sets(file_name, default_base=None):
+    if file_name.endswith('.csv'):
+        yield from read_csv_sets(file_name, default_base)
+        return
+    for requirements in read_json_sets(file_name):
+        if default_base and not requirements.get('base'):
+            requirements['base'] = default_base
+        yield requirements
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan hierarchical VLSM allocations from JSON/CSV requirement sets")
+    parser.add_argument('input', help="JSON list, JSON lines, or CSV (set,base,region,site,vlan,hosts)")
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), default='csv', help="Output format")
+    parser.add_argument('--base', help="Base block for sets that do not give one, e.g. 10.0.0.0/8")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    out_file = open(args.output, 'w', newline='') if args.output else sys.stdout
+    planned = failed = 0
+    try:
+        if args.format == 'csv':
+            writer = csv.DictWriter(out_file, fieldnames=OUTPUT_FIELDS, restval='')
+            writer.writeheader()
+        for name, rows, ok in plan_many(read_sets(args.input, args.base), args.workers):
+            if args.format == 'csv':
+                writer.writerows(rows)
+            else:
+                out_file.write(json.dumps({'set': name, 'ok': ok, 'subnets': rows}) + '\n')
+            if ok:
+                planned += 1
+            else:
+                failed += 1
+                print(f"Error in set '{name}': {rows[0]['error']}", file=sys.stderr)
+    finally:
+        if args.output:
+            out_file.close()
+
+    print(f"Planned {planned} sets, {failed} failed", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()